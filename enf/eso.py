@@ -4,20 +4,32 @@ ESO's system frequency data. It utilizes local caching to avoid redundant networ
 
 """
 
+import io
 import os
 import logging
-from datetime import datetime, date
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from functools import lru_cache
 
-import requests
+import numpy as np
 import pandas as pd
 
+from enf.series import ENFSeries
+from enf.session import create_session
+
 logger = logging.getLogger(__name__)
 
 ESO_DATA_URL = 'https://data.nationalgrideso.com/system/system-frequency-data/datapackage.json'
 nominal_freq = 50
+MAX_WORKERS = 8
+# Directory parsed months are cached in, set to None (the default, unless ENF_ESO_CACHE_DIR is set) to disable caching
+CACHE_DIR = os.environ.get('ENF_ESO_CACHE_DIR')
+
+_session = create_session()
 
 
-def query_dates(dates: list[date]) -> list[tuple[str, float]]:
+def query_dates(dates: list[date]) -> ENFSeries:
     """
     Queries frequency data for a list of dates.
 
@@ -25,50 +37,181 @@ def query_dates(dates: list[date]) -> list[tuple[str, float]]:
     dates (list[date]): List of date objects to query data for.
 
     Returns:
-    list[tuple[str, float]]: List of tuples containing the timestamp and frequency.
+    ENFSeries: The timestamps and frequencies.
     """
     logger.info(f'Querying ESO data for {len(dates)} dates')
 
-    collected_data = []
+    unique_months = sorted(set((d.year, d.month) for d in dates))
+    if not unique_months:
+        return ENFSeries.concatenate([])
+
+    # Load the catalogue once up front and share it between the workers, unless every month is already cached
+    catalogue = None
+    if not all(_is_cached(year, month) for year, month in unique_months):
+        catalogue = _resources_index()
 
-    unique_months = set((d.year, d.month) for d in dates)
-    for year, month in unique_months:
-        collected_data.extend(
-            query_month(year, month)
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(unique_months) or 1)) as executor:
+        df = pd.concat(
+            executor.map(lambda ym: _read_month(*ym, catalogue=catalogue), unique_months),
+            ignore_index=True
         )
 
-    return [r for r in collected_data if datetime.fromisoformat(r[0]).date() in dates]
+    day = df['dtm'].to_numpy().astype('datetime64[D]')
+    target = np.array(sorted(set(dates)), dtype='datetime64[D]')
 
+    return _to_series(df.loc[np.isin(day, target)])
 
-def query_month(year: int, month: int) -> list[tuple[str, float]]:
+
+def query_month(year: int, month: int, *, catalogue: dict = None) -> ENFSeries:
     """
     Fetches reference ENF data from Great Britain for the given date and caches the response locally.
 
     Parameters:
     year (int): The year of the data to fetch.
     month (int): The month of the data to fetch.
+    catalogue (dict, optional): The resource index to look the month up in. Defaults to the cached ESO catalogue.
 
     Returns:
-    tuple: A tuple containing numpy arrays of datetime objects and frequency values.
+    ENFSeries: The timestamps and frequencies.
     """
     logger.info(f'Querying ESO data for {year}-{month}')
 
-    resource_path = get_resource(year, month)['path']
-    df = pd.read_csv(resource_path)
+    return _to_series(_read_month(year, month, catalogue=catalogue))
+
+
+def _read_month(year: int, month: int, *, catalogue: dict = None) -> pd.DataFrame:
+    """
+    Download and parse the ESO frequency data for the given year and month.
+
+    Parameters:
+    year (int): The year of the data to fetch.
+    month (int): The month of the data to fetch.
+    catalogue (dict, optional): The resource index to look the month up in. Defaults to the cached ESO catalogue.
+
+    Returns:
+    pd.DataFrame: The data with a datetime64 `dtm` column and a float `f` column.
+    """
+    if _is_cached(year, month):
+        cache_path = _cache_path(year, month)
+        try:
+            return pd.read_feather(cache_path)
+        except Exception as e:
+            logger.warning(f'Discarding unreadable cache file {cache_path}: {e}')
+            os.remove(cache_path)
+
+    resource_path = get_resource(year, month, catalogue=catalogue)['path']
+    res = _session.get(resource_path)
+    res.raise_for_status()
+
+    df = pd.read_csv(
+        io.BytesIO(res.content),
+        engine='pyarrow',
+        dtype={'f': 'float64'},
+        parse_dates=['dtm']
+    )
+
+    if CACHE_DIR is not None and _is_final(year, month, df):
+        # Write to a temporary file first so concurrent readers never see a partial cache entry
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        df.to_feather(tmp_path, compression='lz4')
+        os.replace(tmp_path, _cache_path(year, month))
+
+    return df
 
-    df['dtm'] = pd.to_datetime(df['dtm'])
-    df['f'] = df['f'].astype(float)
 
-    return [(dt.isoformat(), f) for dt, f in zip(df['dtm'], df['f'])]
+def clear_cache() -> None:
+    """
+    Delete every month cached in CACHE_DIR, so the next queries download fresh data.
+    """
+    if CACHE_DIR is None or not os.path.isdir(CACHE_DIR):
+        return
+
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.feather'):
+            os.remove(os.path.join(CACHE_DIR, name))
+
+
+def _is_cached(year: int, month: int) -> bool:
+    """
+    Check whether the given year and month is in the local cache.
+
+    Parameters:
+    year (int): The year of the data.
+    month (int): The month of the data.
+
+    Returns:
+    bool: True if the month can be read from the cache.
+    """
+    return CACHE_DIR is not None and os.path.exists(_cache_path(year, month))
 
 
-def get_resource(year: int, month: int) -> dict:
+def _is_final(year: int, month: int, df: pd.DataFrame) -> bool:
+    """
+    Check whether the data for the given year and month is unlikely to change and is therefore safe to cache.
+
+    The current and most recent months are never final, as ESO may still be filling in or republishing them, and
+    neither is a month whose data stops before its last day.
+
+    Parameters:
+    year (int): The year of the data.
+    month (int): The month of the data.
+    df (pd.DataFrame): The data as parsed by `_read_month`.
+
+    Returns:
+    bool: True if the data can be cached.
+    """
+    today = datetime.now(timezone.utc).date()
+    if (today.year * 12 + today.month) - (year * 12 + month) < 2:
+        return False
+
+    if df.empty:
+        return False
+
+    month_end = (pd.Timestamp(year=year, month=month, day=1) + pd.offsets.MonthEnd(1)).date()
+
+    return df['dtm'].max().date() >= month_end
+
+
+def _cache_path(year: int, month: int) -> str:
+    """
+    Get the path of the local cache file for the given year and month in CACHE_DIR.
+
+    Parameters:
+    year (int): The year of the data.
+    month (int): The month of the data.
+
+    Returns:
+    str: The path of the cache file.
+    """
+    return os.path.join(CACHE_DIR, f'{year}-{month}.feather')
+
+
+def _to_series(df: pd.DataFrame) -> ENFSeries:
+    """
+    Convert ESO frequency data to an ENFSeries.
+
+    Parameters:
+    df (pd.DataFrame): The data as returned by `_read_month`.
+
+    Returns:
+    ENFSeries: The timestamps and frequencies.
+    """
+    return ENFSeries(
+        df['dtm'].to_numpy(dtype='datetime64[s]'),
+        df['f'].to_numpy(dtype=np.float64)
+    )
+
+
+def get_resource(year: int, month: int, *, catalogue: dict = None) -> dict:
     """
     Get the resource metadata for the given year and month.
 
     Parameters:
     year (int): The year of the resource.
     month (int): The month of the resource.
+    catalogue (dict, optional): The resource index to look the month up in. Defaults to the cached ESO catalogue.
 
     Returns:
     dict: The resource metadata.
@@ -76,14 +219,12 @@ def get_resource(year: int, month: int) -> dict:
     Raises:
     KeyError: If the resource for the specified year and month is not found.
     """
-    res = requests.get(ESO_DATA_URL)
-    res.raise_for_status()
-
-    resources = res.json()['result']['resources']
+    if catalogue is None:
+        catalogue = _resources_index()
 
     try:
-        return next(r for r in resources if r['path'].endswith(f"{year}-{month}.csv"))
-    except StopIteration:
+        return catalogue[(str(year), str(month))]
+    except KeyError:
         raise KeyError(f"Resource for {year}-{month} not found")
 
 
@@ -94,15 +235,37 @@ def get_resources() -> dict:
     Returns:
     dict: A dictionary with (year, month) tuples as keys and resource paths as values.
     """
-    res = requests.get(ESO_DATA_URL)
+    return {key: r['path'] for key, r in _resources_index().items()}
+
+
+@lru_cache(maxsize=1)
+def _catalogue() -> list[dict]:
+    """
+    Get the ESO resource catalogue, downloading it only once per process.
+
+    Call `_catalogue.cache_clear()` and `_resources_index.cache_clear()` to force a fresh download.
+
+    Returns:
+    list[dict]: The metadata of every available resource.
+    """
+    res = _session.get(ESO_DATA_URL)
     res.raise_for_status()
 
-    resources = res.json()['result']['resources']
+    return res.json()['result']['resources']
+
 
-    monthly_data = {}
-    for r in resources:
+@lru_cache(maxsize=1)
+def _resources_index() -> dict:
+    """
+    Index the ESO resource catalogue by the year and month of each resource.
+
+    Returns:
+    dict: A dictionary with (year, month) string tuples as keys and resource metadata as values.
+    """
+    index = {}
+    for r in _catalogue():
         year, month = os.path.splitext(r['path'].split('/')[-1])[0].split('-')[1:3]
         month = month.rstrip('_')
-        monthly_data[(year, month)] = r['path']
+        index.setdefault((year, month), r)
 
-    return monthly_data
+    return index
@@ -6,17 +6,26 @@ Module for querying historical frequency data from the GridRadar API.
 import os
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 
-import requests
+import numpy as np
+import pandas as pd
+
+from enf.series import ENFSeries
+from enf.session import create_session
 
 logger = logging.getLogger(__name__)
 
 GRIDRADAR_API_URL = 'https://api.gridradar.net'
 nominal_freq = 50
+MAX_WORKERS = 4
+
+_session = create_session()
 
 
-def query_dates(dates: list[date]) -> list[tuple[str, float]]:
+def query_dates(dates: list[date]) -> ENFSeries:
     """
     Queries frequency data for a list of dates.
 
@@ -24,20 +33,21 @@ def query_dates(dates: list[date]) -> list[tuple[str, float]]:
     dates (list[date]): List of date objects to query data for.
 
     Returns:
-    list[tuple[str, float]]: List of tuples containing the timestamp and frequency.
+    ENFSeries: The timestamps and frequencies.
     """
     logger.info(f'Querying GridRadar data for {len(dates)} dates')
-    collected_data = []
+
+    ranges = []
     for d in dates:
         from_ts = datetime.combine(d, datetime.min.time())
         to_ts = from_ts + timedelta(seconds=86399)
 
-        collected_data.extend(query_range(from_ts, to_ts))
+        ranges.append((from_ts, to_ts))
 
-    return collected_data
+    return _query_ranges(ranges)
 
 
-def query_range(from_dt: datetime, to_dt: datetime) -> list[tuple[str, float]]:
+def query_range(from_dt: datetime, to_dt: datetime) -> ENFSeries:
     """
     Queries frequency data for a specific time range.
 
@@ -46,40 +56,72 @@ def query_range(from_dt: datetime, to_dt: datetime) -> list[tuple[str, float]]:
     to_ts (datetime): End datetime of the query range.
 
     Returns:
-    list[tuple[str, float]]: List of tuples containing the timestamp and frequency.
+    ENFSeries: The timestamps and frequencies.
     """
     logger.info(f'Querying GridRadar data from {from_dt} to {to_dt}')
 
+    return _query_ranges([(from_dt, to_dt)])
+
+
+def _query_ranges(ranges: list[tuple[datetime, datetime]]) -> ENFSeries:
+    """
+    Queries frequency data for several time ranges, issuing the API calls concurrently within the rate limit.
+
+    Parameters:
+    ranges (list[tuple[datetime, datetime]]): The start and end datetimes of each range.
+
+    Returns:
+    ENFSeries: The timestamps and frequencies of all ranges, in order.
+    """
     account_info = get_account_info()
     logger.info(f'Account info: {account_info}')
 
     max_span = timedelta(milliseconds=account_info['rq_max_period_historic-median-1s'])
     min_interval = timedelta(milliseconds=account_info['rq_min_interval_historic-median-1s'])
 
-    current_start = from_dt
-    collected_data = []
+    segments = []
+    for from_dt, to_dt in ranges:
+        current_start = from_dt
+        while current_start < to_dt:
+            current_end = min(current_start + max_span, to_dt)
+            segments.append((current_start, current_end))
+            current_start = current_end
+
+    # Requests are started on a fixed schedule instead of sleeping after each response, so waiting for one
+    # segment overlaps with fetching the others
+    lock = threading.Lock()
+    next_slot = time.monotonic()
 
-    while current_start < to_dt:
-        current_end = min(current_start + max_span, to_dt)
+    def fetch(segment: tuple[datetime, datetime]) -> list:
+        nonlocal next_slot
+
+        with lock:
+            now = time.monotonic()
+            slot = max(next_slot, now)
+            next_slot = slot + min_interval.total_seconds()
+
+        time.sleep(slot - now)
 
         params = {
             'metric': 'historic-median-1s',
             'area': 'CE',
-            'from': to_rfc3339(current_start),
-            'to': to_rfc3339(current_end),
+            'from': to_rfc3339(segment[0]),
+            'to': to_rfc3339(segment[1]),
             'format': 'json'
         }
 
-        res = auth_get('query', params=params)[0]['datapoints']
+        return auth_get('query', params=params)[0]['datapoints']
 
-        collected_data.extend(res)
-
-        current_start = current_end
+    collected_data = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for datapoints in executor.map(fetch, segments):
+            collected_data.extend(datapoints)
 
-        if current_start < to_dt:
-            time.sleep(min_interval.total_seconds())
+    # Parse the timestamps in one batch, normalised to naive UTC like the ESO data
+    times = pd.to_datetime([r[1] for r in collected_data], utc=True).tz_convert(None)
+    freqs = np.array([r[0] for r in collected_data], dtype=np.float64)
 
-    return [(datetime.fromisoformat(r[1]).isoformat(), r[0]) for r in collected_data]
+    return ENFSeries(times.to_numpy(dtype='datetime64[s]'), freqs)
 
 
 def get_account_info() -> dict:
@@ -102,7 +144,7 @@ def auth_get(endpoint: str, params: dict = None) -> dict:
     logger.info(f'Querying GridRadar API endpoint: {endpoint}')
     api_token = os.environ['GRIDRADAR_API_TOKEN']
 
-    res = requests.get(
+    res = _session.get(
         f'{GRIDRADAR_API_URL}/{endpoint}',
         headers={'Authorization': f'Bearer {api_token}'},
         params=params or {}
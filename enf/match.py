@@ -5,71 +5,170 @@ including Pearson correlation, STUMP and Euclidean distance.
 Dependencies:
 - stumpy
 - numpy
+- numba
 - scipy
 """
 
 import stumpy
 import numpy as np
-from numpy.lib.stride_tricks import sliding_window_view
-from scipy.spatial import distance
+from numba import cuda
+from scipy import signal
 
+# Time series shorter than this are matched on the CPU, where the GPU transfer overhead isn't worth paying
+GPU_MIN_LENGTH = 100_000
 
-def pmcc(Q: np.ndarray, T: np.ndarray) -> list:
+_HAS_GPU = cuda.is_available()
+
+
+def pmcc(Q: np.ndarray, T: np.ndarray, top_k: int = None) -> list:
     """
     Perform Pearson correlation between query Q and time series T.
 
     Parameters:
     Q (np.ndarray): The query time series.
     T (np.ndarray): The target time series.
+    top_k (int, optional): Only return the best top_k matches. Defaults to None, returning all of them.
 
     Returns:
     list: Sorted list of tuples containing the index and correlation coefficient.
     """
-    v = sliding_window_view(T, len(Q))
+    Q = np.asarray(Q, dtype=float)
+    T = np.asarray(T, dtype=float)
+    W = len(Q)
+
+    # Pearson correlation is shift invariant, centring T keeps the cumulative sums well conditioned
+    T = T - T.mean()
+    cT = np.concatenate(([0.], np.cumsum(T)))
+    cT2 = np.concatenate(([0.], np.cumsum(T * T)))
+
+    mu = (cT[W:] - cT[:-W]) / W
+    s2 = (cT2[W:] - cT2[:-W]) / W - mu ** 2
+    num = signal.convolve(T, (Q - Q.mean())[::-1], mode='valid') / W
+
+    # Flat windows have no defined correlation, their variance is only rounding error so mark them as nan to rank last
+    flat = s2 <= np.finfo(float).eps * cT2[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = num / (np.sqrt(np.where(flat, np.nan, s2)) * Q.std())
 
-    return sorted(
-        [(i, np.corrcoef(w, Q)[0][1]) for i, w in enumerate(v)],
-        key=lambda item: -item[1]
-    )
+    # Rounding can push the rolling formula just past +-1, clip like np.corrcoef does
+    corr = np.clip(corr, -1, 1)
+    idx = _rank(-corr, top_k)
 
+    return list(zip(idx.tolist(), corr[idx].tolist()))
 
-def stump(Q: np.ndarray, T: np.ndarray) -> list:
+
+def stump(Q: np.ndarray, T: np.ndarray, top_k: int = None) -> list:
     """
     Perform STUMP (Matrix Profile) based similarity search between query Q and time series T.
 
     Parameters:
     Q (np.ndarray): The query time series.
     T (np.ndarray): The target time series.
+    top_k (int, optional): Only return the best top_k matches. Defaults to None, returning all of them.
 
     Returns:
     list: Sorted list of tuples containing the index and distance.
     """
-    matches = stumpy.match(
-        np.array(Q, dtype=float),
-        np.array(T, dtype=float),
-        # max_distance=lambda D: max(np.mean(D) - 4 * np.std(D), np.min(D))
-    )
+    Q = np.asarray(Q, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+
+    if _HAS_GPU and len(T) > GPU_MIN_LENGTH:
+        # An AB-join against the single subsequence of Q yields the distance profile of Q along T
+        distance_profile = stumpy.gpu_stump(T, len(Q), Q, ignore_trivial=False, device_id=0)[:, 0].astype(float)
+        indices, distances = _find_matches(distance_profile, len(Q))
+    else:
+        matches = stumpy.match(
+            Q,
+            T,
+            # max_distance=lambda D: max(np.mean(D) - 4 * np.std(D), np.min(D))
+        )
+
+        distances = matches[:, 0].astype(float)
+        indices = matches[:, 1].astype(int)
+
+    idx = _rank(distances, top_k)
 
-    return sorted(
-        [(i, d) for d, i in matches],
-        key=lambda item: item[1]
-    )
+    return list(zip(indices[idx].tolist(), distances[idx].tolist()))
 
 
-def euclidean(Q: np.ndarray, T: np.ndarray) -> list:
+def euclidean(Q: np.ndarray, T: np.ndarray, top_k: int = None) -> list:
     """
     Perform Euclidean distance based similarity search between query Q and time series T.
 
     Parameters:
     Q (np.ndarray): The query time series.
     T (np.ndarray): The target time series.
+    top_k (int, optional): Only return the best top_k matches. Defaults to None, returning all of them.
 
     Returns:
     list: Sorted list of tuples containing the index and Euclidean distance.
     """
-    v = sliding_window_view(T, len(Q))
+    Q = np.asarray(Q, dtype=float)
+    T = np.asarray(T, dtype=float)
+    W = len(Q)
+
+    # Distances are invariant to a common shift, removing the offset avoids cancellation in the expansion below
+    offset = T.mean()
+    Q = Q - offset
+    T = T - offset
+
+    cT2 = np.concatenate(([0.], np.cumsum(T * T)))
+    sum_w2 = cT2[W:] - cT2[:-W]
+    cross = signal.convolve(T, Q[::-1], mode='valid')
+
+    d2 = np.clip(sum_w2 - 2 * cross + Q @ Q, 0, None)
+    idx = _rank(d2, top_k)
+
+    return list(zip(idx.tolist(), np.sqrt(d2[idx]).tolist()))
+
+
+def _find_matches(distance_profile: np.ndarray, m: int) -> tuple:
+    """
+    Select the matches in a distance profile the same way `stumpy.match` does with its default arguments.
+
+    Parameters:
+    distance_profile (np.ndarray): The z-normalized distance of the query to every subsequence of the time series.
+    m (int): The length of the query.
+
+    Returns:
+    tuple: The indices and distances of the matches.
+    """
+    excl_zone = int(np.ceil(m / stumpy.config.STUMPY_EXCL_ZONE_DENOM))
+    max_distance = max(np.mean(distance_profile) - 2 * np.std(distance_profile), np.min(distance_profile))
+
+    excluded = np.zeros(len(distance_profile), dtype=bool)
+    indices = []
+    for i in np.argsort(distance_profile, kind='stable'):
+        if distance_profile[i] > max_distance:
+            break
+        if excluded[i]:
+            continue
+
+        indices.append(i)
+        excluded[max(i - excl_zone, 0):i + excl_zone + 1] = True
+
+    indices = np.array(indices, dtype=int)
+
+    return indices, distance_profile[indices]
+
+
+def _rank(scores: np.ndarray, top_k: int = None) -> np.ndarray:
+    """
+    Get the indices that sort the scores in ascending order.
+
+    Parameters:
+    scores (np.ndarray): The scores to rank, lower is better.
+    top_k (int, optional): Only rank the top_k lowest scores. Defaults to None, ranking all of them.
+
+    Returns:
+    np.ndarray: The indices of the ranked scores.
+    """
+    if top_k is None or top_k >= len(scores):
+        return np.argsort(scores, kind='stable')
+
+    if top_k <= 0:
+        return np.empty(0, dtype=int)
+
+    idx = np.argpartition(scores, top_k - 1)[:top_k]
 
-    return sorted(
-        [(i, distance.euclidean(w, Q)) for i, w in enumerate(v)],
-        key=lambda item: item[1]
-    )
+    return idx[np.argsort(scores[idx], kind='stable')]
@@ -0,0 +1,68 @@
+"""
+This module provides the container used to pass Electric Network Frequency (ENF) time series between the data fetchers
+and the matching functions.
+
+Dependencies:
+- numpy
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ENFSeries:
+    """
+    A frequency time series stored as a struct of arrays.
+
+    Attributes:
+    t (np.ndarray): The timestamps as datetime64[s] values.
+    f (np.ndarray): The frequency values as float64, kept at full precision so they round trip to the source values.
+    """
+    t: np.ndarray
+    f: np.ndarray
+
+    def __post_init__(self):
+        self.t = np.asarray(self.t, dtype='datetime64[s]')
+        self.f = np.asarray(self.f, dtype=np.float64)
+
+        if self.t.shape != self.f.shape:
+            raise ValueError("Timestamps and frequencies must have the same shape")
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ENFSeries):
+            return NotImplemented
+
+        return np.array_equal(self.t, other.t) and np.array_equal(self.f, other.f)
+
+    @classmethod
+    def concatenate(cls, series: list['ENFSeries']) -> 'ENFSeries':
+        """
+        Join several series end to end.
+
+        Parameters:
+        series (list[ENFSeries]): The series to join.
+
+        Returns:
+        ENFSeries: The joined series.
+        """
+        if not series:
+            return cls(np.empty(0, dtype='datetime64[s]'), np.empty(0, dtype=np.float64))
+
+        return cls(
+            np.concatenate([s.t for s in series]),
+            np.concatenate([s.f for s in series])
+        )
+
+    def as_tuples(self) -> list[tuple[str, float]]:
+        """
+        Convert the series to the list of (timestamp, frequency) tuples returned by earlier versions of the fetchers.
+
+        Returns:
+        list[tuple[str, float]]: List of tuples containing the ISO formatted timestamp and frequency.
+        """
+        return list(zip(np.datetime_as_string(self.t, unit='s').tolist(), self.f.tolist()))
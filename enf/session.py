@@ -0,0 +1,32 @@
+"""
+This module provides the HTTP session shared by the data fetchers, so that connections are pooled and kept alive
+across requests.
+
+Dependencies:
+- requests
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session() -> requests.Session:
+    """
+    Create a requests session with a connection pool, retries and compressed responses.
+
+    Returns:
+    requests.Session: The configured session.
+    """
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(3, backoff_factor=0.5)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
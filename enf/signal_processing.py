@@ -3,17 +3,25 @@ This module provides several functions for processing and analyzing time series
 techniques like resampling, decimation, filtering, and the extraction of the Electric Network Frequency (ENF) series.
 
 Dependencies:
+- functools
 - math
+- typing
+- numba
 - numpy
 - scipy
 """
 
 import math
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+import numba
 import numpy as np
 from scipy import signal
 
 
-def enf_series(data: np.ndarray, low_cut: float, high_cut: float, fs: int, new_fs: int = None) -> np.ndarray:
+def enf_series(data: np.ndarray, low_cut: float, high_cut: float, fs: int, new_fs: int = None,
+               chunk_seconds: int = 600) -> np.ndarray:
     """
     Extract the Electric Network Frequency (ENF) series from the input data.
 
@@ -23,24 +31,34 @@ def enf_series(data: np.ndarray, low_cut: float, high_cut: float, fs: int, new_f
     high_cut (float): The high cutoff frequency for bandpass filtering.
     fs (int): The sampling frequency of the input data.
     new_fs (int, optional): The new sampling frequency for resampling. Defaults to None.
+    chunk_seconds (int, optional): The length in seconds of the chunks the data is processed in. Defaults to 600.
 
     Returns:
     np.ndarray: The extracted ENF series.
     """
+    # Single precision is ample for audio and halves the memory traffic of every stage, each chunk is converted
+    # separately so the whole recording is never copied
+    data = np.asarray(data)
+
     if new_fs and new_fs < fs:
-        fs, data = resample(data, fs, new_fs)
+        chunks = _resample_chunks(data, fs, new_fs, chunk_seconds)
+        fs = new_fs
+    else:
+        chunk_size = chunk_seconds * fs
+        chunks = (
+            np.ascontiguousarray(data[i:i + chunk_size], dtype=np.float32) for i in range(0, len(data), chunk_size)
+        )
 
     filter_order = 4
-    data = butter_bandpass_filter(
-        data, filter_order, low_cut, high_cut, fs
-    )
+    sos = _cached_sos(filter_order, low_cut, high_cut, fs).astype(np.float32)
 
-    f, t, zxx = stft(data, fs)
+    def bandpass(chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        zi = np.zeros((sos.shape[0], 2), dtype=np.float32)
+        for chunk in chunks:
+            filtered, zi = signal.sosfilt(sos, chunk, zi=zi)
+            yield filtered
 
-    # bin_size = f[1] - f[0]
-    # return interpolate(zxx, bin_size)
-
-    return median_filter(f, t, zxx)
+    return _sliding_dft_chunks(bandpass(chunks), low_cut, high_cut, fs)
 
 
 def resample(data: np.ndarray, fs: int, new_fs: int = 300) -> tuple:
@@ -57,37 +75,46 @@ def resample(data: np.ndarray, fs: int, new_fs: int = 300) -> tuple:
     """
     _validate_fs(fs, new_fs)
 
-    wave_duration = len(data) / fs
-    num_samples = int(wave_duration * new_fs)
+    gcd = math.gcd(fs, new_fs)
 
-    return new_fs, signal.resample(data, num_samples)
+    return new_fs, signal.resample_poly(data, new_fs // gcd, fs // gcd)
 
 
-def decimate_and_interpolate(data: np.ndarray, fs: int, new_fs: int = 300) -> tuple:
+def _resample_chunks(data: np.ndarray, fs: int, new_fs: int, chunk_seconds: int) -> Iterator[np.ndarray]:
     """
-    Decimate and then interpolate the input data to a new sampling frequency.
+    Resample the input data chunk by chunk in single precision, giving the same result as `resample` on the whole
+    input converted to float32.
+
+    Each chunk is resampled with enough of its neighbours to cover the polyphase filter, which is then trimmed off.
 
     Parameters:
     data (np.ndarray): The input time series data.
     fs (int): The original sampling frequency.
-    new_fs (int, optional): The new sampling frequency. Defaults to 300.
+    new_fs (int): The new sampling frequency.
+    chunk_seconds (int): The length of each chunk in seconds.
 
-    Returns:
-    tuple: The new sampling frequency and the processed data.
+    Yields:
+    np.ndarray: Consecutive float32 chunks of the resampled data.
     """
     _validate_fs(fs, new_fs)
 
     gcd = math.gcd(fs, new_fs)
+    up, down = new_fs // gcd, fs // gcd
 
-    decimation_factor = fs // gcd
-    interpolation_factor = new_fs // gcd
+    # Half length of the filter designed by resample_poly, rounded up so chunk boundaries stay on output samples
+    pad = down * math.ceil(10 * max(up, down) / down)
+    chunk_size = chunk_seconds * fs
 
-    decimated_data = signal.decimate(data, decimation_factor, ftype='fir')
+    for start in range(0, len(data), chunk_size):
+        end = min(start + chunk_size, len(data))
+        lo, hi = max(start - pad, 0), min(end + pad, len(data))
+
+        resampled = signal.resample_poly(np.ascontiguousarray(data[lo:hi], dtype=np.float32), up, down)
 
-    final_length = len(decimated_data) * interpolation_factor
-    interpolated_data = signal.resample(decimated_data, final_length)
+        out_start = (start - lo) * up // down
+        out_len = math.ceil(end * up / down) - start * up // down
 
-    return new_fs, interpolated_data
+        yield resampled[out_start:out_start + out_len]
 
 
 def almost_decimate(data: np.ndarray, fs: int, new_fs: int = 300) -> tuple:
@@ -142,13 +169,30 @@ def butter_bandpass_filter(data: np.ndarray, order: int, low_cut: float, high_cu
     Returns:
     np.ndarray: The filtered data.
     """
-    sos = butter_bandpass(
+    sos = _cached_sos(
         order, low_cut, high_cut, fs
     )
 
     return signal.sosfilt(sos, data)
 
 
+@lru_cache(maxsize=32)
+def _cached_sos(order: int, low_cut: float, high_cut: float, fs: int) -> np.ndarray:
+    """
+    Create a Butterworth bandpass filter in second-order sections, designing it only once per configuration.
+
+    Parameters:
+    order (int): The order of the filter.
+    low_cut (float): The low cutoff frequency.
+    high_cut (float): The high cutoff frequency.
+    fs (int): The sampling frequency.
+
+    Returns:
+    np.ndarray: The filter coefficients, shared between callers.
+    """
+    return butter_bandpass(order, low_cut, high_cut, fs)
+
+
 def butter_bandpass(order: int, low_cut: float, high_cut: float, fs: int, output: str = 'sos') -> np.ndarray:
     """
     Create a Butterworth bandpass filter.
@@ -191,7 +235,7 @@ def stft(data: np.ndarray, fs: int, window_size: int = 64) -> tuple:
     return signal.stft(data, fs, nperseg=nperseg, noverlap=noverlap)
 
 
-def interpolate(zxx: np.ndarray, bin_size: float) -> list:
+def interpolate(zxx: np.ndarray, bin_size: float) -> np.ndarray:
     """
     Interpolate the STFT results to find the maximum frequency components.
 
@@ -200,26 +244,48 @@ def interpolate(zxx: np.ndarray, bin_size: float) -> list:
     bin_size (float): The bin size of the frequency components.
 
     Returns:
-    list: The interpolated maximum frequency components.
+    np.ndarray: The interpolated maximum frequency components.
     """
-    def quadratic_interpolation(data: np.ndarray, max_idx: int, bin_size: float) -> float:
-        left = data[max_idx - 1]
-        center = data[max_idx]
-        right = data[max_idx + 1]
+    return _quadratic_peaks(np.ascontiguousarray(zxx), bin_size)
 
-        p = 0.5 * (left - right) / (left - 2 * center + right)
 
-        return (max_idx + p) * bin_size
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def _quadratic_peaks(zxx: np.ndarray, bin_size: float) -> np.ndarray:
+    """
+    Find the peak of each STFT frame and refine it with quadratic interpolation in a single pass.
 
-    max_freqs = []
-    for spectrum in np.abs(np.transpose(zxx)):
-        max_amp = np.amax(spectrum)
-        max_freq_idx = np.where(spectrum == max_amp)[0][0]
+    Parameters:
+    zxx (np.ndarray): The STFT of the input data, frequencies along the first axis.
+    bin_size (float): The bin size of the frequency components.
 
-        max_freq = quadratic_interpolation(spectrum, max_freq_idx, bin_size)
-        max_freqs.append(max_freq)
+    Returns:
+    np.ndarray: The interpolated maximum frequency of each frame.
+    """
+    n_bins, n_frames = zxx.shape
+    out = np.empty(n_frames)
+
+    for j in numba.prange(n_frames):
+        # Rank the bins by power, which picks the same peak as the magnitude without a sqrt per bin
+        max_idx = 0
+        max_power = -1.0
+        for i in range(n_bins):
+            power = zxx[i, j].real ** 2 + zxx[i, j].imag ** 2
+            if power > max_power:
+                max_power = power
+                max_idx = i
+
+        p = 0.0
+        if 0 < max_idx < n_bins - 1:
+            left = abs(zxx[max_idx - 1, j])
+            center = abs(zxx[max_idx, j])
+            right = abs(zxx[max_idx + 1, j])
+            denominator = left - 2 * center + right
+            if denominator != 0:
+                p = 0.5 * (left - right) / denominator
 
-    return max_freqs
+        out[j] = (max_idx + p) * bin_size
+
+    return out
 
 
 def median_filter(f: np.ndarray, t: np.ndarray, zxx: np.ndarray) -> np.ndarray:
@@ -234,9 +300,131 @@ def median_filter(f: np.ndarray, t: np.ndarray, zxx: np.ndarray) -> np.ndarray:
     Returns:
     np.ndarray: The filtered frequency components.
     """
-    peak_freqs = [
-        f[idx] for i in range(len(t))
-        if (idx := np.argmax(zxx[:, i]))
-    ]
+    peak_freqs = f[np.argmax(np.abs(zxx[:, :len(t)]), axis=0)]
 
     return signal.medfilt(peak_freqs, kernel_size=29)
+
+
+def sliding_dft(data: np.ndarray, low_cut: float, high_cut: float, fs: int, window_size: int = 64) -> np.ndarray:
+    """
+    Track the dominant frequency between the cutoffs once per second and apply a median filter to it.
+
+    This is equivalent to taking the peak of a Hann windowed STFT with a one second hop, but only the DFT bins
+    within the band are updated, so no spectrum is ever materialised.
+
+    Parameters:
+    data (np.ndarray): The input time series data.
+    low_cut (float): The lowest frequency to track.
+    high_cut (float): The highest frequency to track.
+    fs (int): The sampling frequency.
+    window_size (int, optional): The window size in seconds. Defaults to 64.
+
+    Returns:
+    np.ndarray: The filtered peak frequencies.
+    """
+    return _sliding_dft_chunks([data], low_cut, high_cut, fs, window_size)
+
+
+def _sliding_dft_chunks(chunks: Iterable[np.ndarray], low_cut: float, high_cut: float, fs: int,
+                        window_size: int = 64) -> np.ndarray:
+    """
+    Same as `sliding_dft`, but consumes the input data as consecutive chunks.
+
+    Parameters:
+    chunks (Iterable[np.ndarray]): Consecutive chunks of the input time series data.
+    low_cut (float): The lowest frequency to track.
+    high_cut (float): The highest frequency to track.
+    fs (int): The sampling frequency.
+    window_size (int, optional): The window size in seconds. Defaults to 64.
+
+    Returns:
+    np.ndarray: The filtered peak frequencies.
+    """
+    n_window = fs * window_size
+
+    k_low = max(math.floor(low_cut * window_size), 1)
+    k_high = min(math.ceil(high_cut * window_size), n_window // 2 - 1)
+
+    # The neighbouring bins on either side are needed to apply the Hann window in the frequency domain
+    bins = np.arange(k_low - 1, k_high + 2)
+    twiddle = np.exp(-2j * np.pi * np.arange(n_window) / n_window)
+    acc = np.zeros(len(bins), dtype=np.complex128)
+
+    history = np.zeros(n_window, dtype=np.float32)
+    n_processed = 0
+    n_data = 0
+    peak_bins = []
+
+    def process(chunk: np.ndarray) -> None:
+        nonlocal history, n_processed
+
+        buffer = np.concatenate((history, np.asarray(chunk, dtype=np.float32)))
+        peak_bins.append(
+            _sliding_dft_peaks(buffer, n_processed, acc, bins, twiddle, n_window, fs)
+        )
+
+        history = buffer[-n_window:]
+        n_processed += len(chunk)
+
+    # Pad the same way as signal.stft so the frames are centred on whole seconds
+    process(np.zeros(n_window // 2, dtype=np.float32))
+    for chunk in chunks:
+        process(chunk)
+        n_data += len(chunk)
+    process(np.zeros(n_window // 2 + (-n_data) % fs, dtype=np.float32))
+
+    return signal.medfilt(np.concatenate(peak_bins) / window_size, kernel_size=29)
+
+
+@numba.njit(cache=True)
+def _sliding_dft_peaks(buffer: np.ndarray, offset: int, acc: np.ndarray, bins: np.ndarray, twiddle: np.ndarray,
+                       n_window: int, hop: int) -> np.ndarray:
+    """
+    Advance the sliding DFT over a chunk of data and find the Hann windowed bin with the highest power in each
+    frame that ends within it.
+
+    Parameters:
+    buffer (np.ndarray): The previous n_window samples followed by the new chunk of data.
+    offset (int): The absolute position of the first sample of the new chunk.
+    acc (np.ndarray): The running DFT of each bin, updated in place.
+    bins (np.ndarray): The DFT bins to track, including one extra neighbour on each side.
+    twiddle (np.ndarray): The DFT twiddle factors for the window size.
+    n_window (int): The window size in samples.
+    hop (int): The number of samples between frames.
+
+    Returns:
+    np.ndarray: The peak bin of each frame.
+    """
+    spectrum = np.empty(len(bins), dtype=np.complex128)
+    peaks = np.empty((len(buffer) - n_window) // hop + 1)
+    n_peaks = 0
+
+    for i in range(n_window, len(buffer)):
+        n = offset + i - n_window
+        delta = buffer[i] - buffer[i - n_window]
+
+        # Twiddles are indexed by absolute sample position, so the accumulators do not drift
+        if delta != 0:
+            for b in range(len(bins)):
+                acc[b] += delta * twiddle[(bins[b] * n) % n_window]
+
+        start = n - n_window + 1
+        if start < 0 or start % hop != 0:
+            continue
+
+        for b in range(len(bins)):
+            spectrum[b] = acc[b] * np.conj(twiddle[(bins[b] * start) % n_window])
+
+        max_power = -1.0
+        max_bin = bins[1]
+        for b in range(1, len(bins) - 1):
+            hann = 0.5 * spectrum[b] - 0.25 * (spectrum[b - 1] + spectrum[b + 1])
+            power = hann.real * hann.real + hann.imag * hann.imag
+            if power > max_power:
+                max_power = power
+                max_bin = bins[b]
+
+        peaks[n_peaks] = max_bin
+        n_peaks += 1
+
+    return peaks[:n_peaks]
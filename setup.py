@@ -10,7 +10,9 @@ setup(
     install_requires=[
         'requests~=2.31.0',
         'numpy~=1.23.0',
+        'numba~=0.56.4',
         'pandas~=2.2.2',
+        'pyarrow~=15.0.2',
         'matplotlib~=3.8.4',
         'stumpy~=1.12.0',
         'scipy~=1.13.0',